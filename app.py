@@ -1,11 +1,15 @@
 from flask_cors import CORS
 from flask import Flask, request, jsonify, session, redirect, url_for
-from generator import SudokuGenerator, print_board
+from generator import SudokuGenerator, print_board, analyze_puzzle, is_unique, cache_stats
+from puzzle_pool import PuzzlePool
+from validation import ValidationState
 import os
 import math
 from pymongo import MongoClient
 from bson import ObjectId
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
@@ -22,18 +26,175 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)  # Session lasts 7 days
 
-# MongoDB connection
+# MongoDB connection. MongoClient is not fork-safe, so it is never created at
+# import time: gunicorn calls init_db() in each worker after forking, and any
+# other process connects lazily on its first request.
 MONGO_URI = os.getenv('MONGO_URI')
-client = MongoClient(MONGO_URI)
-db = client.SudokuSensei
-users_collection = db.users
-games_collection = db.games
+client = None
+db = None
+users_collection = None
+games_collection = None
+
+# Ready-made puzzles, filled by warm_up() in the gunicorn master before forking
+puzzle_pool = PuzzlePool()
+
+# Generates players' next puzzles off the request thread. Threads are only
+# started on first use, so this is safe to create before forking.
+prefetch_executor = ThreadPoolExecutor(max_workers=1)
+
+# Prefetch jobs queued or running in this process, by user id. Each player has
+# at most one, and there are at most MAX_PENDING_PREFETCHES in total, so
+# speculative work cannot pile up and compete with request threads.
+MAX_PENDING_PREFETCHES = 4
+# How long new_game waits for this player's in-flight prefetch
+PREFETCH_WAIT_SECONDS = 10
+pending_prefetches = {}
+pending_prefetches_lock = threading.Lock()
+
+# Times make_move re-reads the game when a concurrent move got there first
+MOVE_ATTEMPTS = 3
+
+
+def init_db(mongo_client=None):
+    """Creates this process's MongoDB client and collection handles."""
+    global client, db, users_collection, games_collection
+    client = mongo_client or MongoClient(MONGO_URI)
+    db = client.SudokuSensei
+    users_collection = db.users
+    games_collection = db.games
+
+
+def warm_up(puzzles_per_difficulty):
+    """
+    Pays the cold-start cost up front: runs the generation code path once and
+    stocks the puzzle pool. Meant to run before forking so workers share it.
+    """
+    puzzle_pool.fill(puzzles_per_difficulty)
+
+
+@app.before_request
+def ensure_db():
+    if db is None:
+        init_db()
 
 
 def count_empty_cells(puzzle):
     """Helper function to count the number of empty cells (zeros) in a puzzle."""
     return sum(row.count(0) for row in puzzle)
 
+# (difficulty_setting, seconds_per_cell, lowest skill, skill upper bound)
+SKILL_BANDS = [
+    ('easy', 10, float('-inf'), 30),
+    ('medium', 15, 30, 70),
+    ('hard', 20, 70, float('inf')),
+]
+
+def is_board_for_puzzle(board, puzzle):
+    """True if `board` is a well-formed board that keeps every given of `puzzle`."""
+    size = len(puzzle)
+    if not isinstance(board, list) or len(board) != size:
+        return False
+    for board_row, puzzle_row in zip(board, puzzle):
+        if not isinstance(board_row, list) or len(board_row) != size:
+            return False
+        for value, given in zip(board_row, puzzle_row):
+            if not is_int(value) or not 0 <= value <= size or (given and value != given):
+                return False
+    return True
+
+def stored_board(game):
+    """The player's board from a game document, or a fresh copy of the puzzle."""
+    return game.get('user_board') or [row[:] for row in game['puzzle']]
+
+def is_int(value):
+    """isinstance check that does not let JSON true/false pass as 1/0."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def skill_band(player_skill):
+    """Maps a skill score to the (difficulty_setting, seconds_per_cell) it plays at."""
+    for difficulty_setting, seconds_per_cell, low, high in SKILL_BANDS:
+        if low <= player_skill < high:
+            return difficulty_setting, seconds_per_cell
+
+def skill_range_query(difficulty_setting):
+    """MongoDB condition matching users whose player_skill falls in the band."""
+    for band, _, low, high in SKILL_BANDS:
+        if band == difficulty_setting:
+            return {'$gte': low, '$lt': high}
+
+def make_puzzle(difficulty_setting):
+    """Takes a puzzle from the pool, generating one if the pool has run dry."""
+    result = puzzle_pool.take(difficulty_setting)
+    if result is None:
+        generator = SudokuGenerator(difficulty=difficulty_setting)
+        result = generator.get_puzzle_and_analysis()
+    return result
+
+def prefetch_next_puzzle(user_id, player_skill):
+    """
+    Starts preparing the player's next puzzle in the background, so the next
+    /api/new-game can return it without generating while the player waits.
+    """
+    difficulty_setting, _ = skill_band(player_skill)
+    with pending_prefetches_lock:
+        if user_id in pending_prefetches or len(pending_prefetches) >= MAX_PENDING_PREFETCHES:
+            return
+        future = prefetch_executor.submit(_store_next_puzzle, user_id, difficulty_setting)
+        pending_prefetches[user_id] = future
+    future.add_done_callback(lambda done: _forget_prefetch(user_id, done))
+
+def _forget_prefetch(user_id, future):
+    with pending_prefetches_lock:
+        if pending_prefetches.get(user_id) is future:
+            del pending_prefetches[user_id]
+
+def wait_for_prefetch(user_id):
+    """
+    Waits for a prefetch this process is still running for the player, e.g.
+    when new_game follows straight after give-up. A prefetch running in
+    another worker is not visible here; its puzzle is used for a later game.
+    """
+    with pending_prefetches_lock:
+        future = pending_prefetches.get(user_id)
+    if future is not None:
+        try:
+            future.result(timeout=PREFETCH_WAIT_SECONDS)
+        except FutureTimeoutError:
+            pass
+
+def _store_next_puzzle(user_id, difficulty_setting):
+    try:
+        # Generate rather than take from the pool: the pool is kept for
+        # cold /api/new-game requests, and this work is only speculative
+        generator = SudokuGenerator(difficulty=difficulty_setting)
+        result = generator.get_puzzle_and_analysis()
+        result['difficulty_setting'] = difficulty_setting
+
+        # Only store it if the player's skill is still in the same band
+        users_collection.update_one(
+            {'_id': user_id, 'player_skill': skill_range_query(difficulty_setting)},
+            {'$set': {'next_puzzle': result}}
+        )
+    except Exception:
+        app.logger.exception("Failed to prefetch next puzzle")
+
+def take_next_puzzle(user_id, difficulty_setting):
+    """
+    Removes and returns the player's prefetched puzzle, or None if there is
+    none or it was prepared for a different skill band.
+    """
+    user = users_collection.find_one_and_update(
+        {'_id': user_id, 'next_puzzle': {'$exists': True}},
+        {'$unset': {'next_puzzle': ''}},
+        projection={'next_puzzle': 1}
+    )
+    if not user:
+        return None
+    next_puzzle = user['next_puzzle']
+    if next_puzzle.pop('difficulty_setting', None) != difficulty_setting:
+        return None
+    return next_puzzle
+
 @app.route('/api/auth/check', methods=['GET'])
 def check_auth():
     """Check if user is authenticated"""
@@ -210,6 +371,8 @@ def give_up():
     # Clear saved game state
     games_collection.delete_one({'user_id': user_id})
     
+    prefetch_next_puzzle(user_id, user.get('player_skill', 20.0))
+    
     return jsonify({
         'success': True,
         'games_given_up': new_give_ups,
@@ -222,14 +385,14 @@ def save_game():
     if not session.get('user_id'):
         return jsonify({'error': 'Not authenticated'}), 401
     
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid request body'}), 400
     user_id = ObjectId(session['user_id'])
     
+    # Puzzle, solution and board are owned by the server (written by
+    # new_game and make_move), so only timer and status fields are taken here
     game_data = {
-        'user_id': user_id,
-        'puzzle': data.get('puzzle'),
-        'user_board': data.get('user_board'),
-        'solution': data.get('solution'),
         'start_time': data.get('start_time'),
         'is_game_active': data.get('is_game_active', False),
         'elapsed_time': data.get('elapsed_time', 0),
@@ -239,11 +402,30 @@ def save_game():
         'updated_at': datetime.utcnow()
     }
     
-    # Update or insert game state
+    game = games_collection.find_one({'user_id': user_id})
+    if not game or not game.get('puzzle') or not game.get('solution'):
+        return jsonify({'error': 'No game in progress'}), 404
+    
+    if not game.get('validation'):
+        # Game saved before server-side validation existed: build the state
+        # against the stored solution, taking the player's latest board only
+        # if it keeps the stored puzzle's givens
+        user_board = data.get('user_board')
+        if not is_board_for_puzzle(user_board, game['puzzle']):
+            user_board = stored_board(game)
+        # Migrate only if a move has not done so in the meantime
+        games_collection.update_one(
+            {'user_id': user_id, 'validation': {'$exists': False}},
+            {'$set': {
+                'user_board': user_board,
+                'validation': ValidationState.build(user_board, game['solution']).to_dict(),
+                'board_version': ObjectId()
+            }}
+        )
+    
     games_collection.update_one(
         {'user_id': user_id},
-        {'$set': game_data},
-        upsert=True
+        {'$set': game_data}
     )
     
     return jsonify({'success': True})
@@ -289,19 +471,18 @@ def new_game():
         return jsonify({'error': 'Not authenticated'}), 401
     
     player_skill = session.get('player_skill', 20.0)
+    difficulty_setting, seconds_per_cell = skill_band(player_skill)
     
-    if player_skill < 30:
-        difficulty_setting = 'easy'
-        seconds_per_cell = 10
-    elif player_skill < 70:
-        difficulty_setting = 'medium'
-        seconds_per_cell = 15
-    else:
-        difficulty_setting = 'hard'
-        seconds_per_cell = 20
-    
-    generator = SudokuGenerator(difficulty=difficulty_setting)
-    result = generator.get_puzzle_and_analysis()
+    user_id = ObjectId(session['user_id'])
+    wait_for_prefetch(user_id)
+    result = take_next_puzzle(user_id, difficulty_setting)
+    # Prefetched puzzles come back from the database, so check and rate what
+    # is served. Puzzles this process generated are cache hits for both.
+    if result is not None and not is_unique(result['puzzle']):
+        result = None
+    if result is None:
+        result = make_puzzle(difficulty_setting)
+    result['analysis'] = analyze_puzzle(result['puzzle'])
 
     puzzle_board = result['puzzle']
     solution_board = result['solution']
@@ -320,9 +501,87 @@ def new_game():
     session['seconds_per_cell'] = seconds_per_cell
     session['difficulty_setting'] = difficulty_setting
 
+    # Keep the authoritative board and validation state server-side
+    user_board = [row[:] for row in puzzle_board]
+    games_collection.update_one(
+        {'user_id': user_id},
+        {'$set': {
+            'user_id': user_id,
+            'puzzle': puzzle_board,
+            'user_board': user_board,
+            'solution': solution_board,
+            'validation': ValidationState.build(user_board, solution_board).to_dict(),
+            'board_version': ObjectId(),
+            'start_time': None,
+            'is_game_active': False,
+            'elapsed_time': 0,
+            'target_time': target_time,
+            'seconds_per_cell': seconds_per_cell,
+            'difficulty_setting': difficulty_setting,
+            'updated_at': datetime.utcnow()
+        }},
+        upsert=True
+    )
+
     result['target_time'] = target_time
     return jsonify(result)
 
+@app.route('/api/game/move', methods=['POST'])
+def make_move():
+    """
+    Places a number (0 clears the cell) on the saved game and reports any
+    row/column/box conflicts and whether the puzzle is now complete.
+    """
+    if not session.get('user_id'):
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid request body'}), 400
+    row, col, value = data.get('row'), data.get('col'), data.get('value')
+    
+    user_id = ObjectId(session['user_id'])
+    for _ in range(MOVE_ATTEMPTS):
+        game = games_collection.find_one({'user_id': user_id})
+        if not game or not game.get('puzzle') or not game.get('solution'):
+            return jsonify({'error': 'No game in progress'}), 404
+        
+        puzzle_board = game['puzzle']
+        size = len(puzzle_board)
+        if not all(is_int(v) for v in (row, col, value)) \
+                or not (0 <= row < size and 0 <= col < size and 0 <= value <= size):
+            return jsonify({'error': 'Invalid move'}), 400
+        if puzzle_board[row][col] != 0:
+            return jsonify({'error': 'Cell is part of the puzzle'}), 400
+        
+        user_board = stored_board(game)
+        if game.get('validation'):
+            state = ValidationState.from_dict(game['validation'])
+        else:
+            # Game saved before server-side validation existed
+            state = ValidationState.build(user_board, game['solution'])
+        conflicts = state.place(user_board, game['solution'], row, col, value)
+        
+        # Write only if no other move changed the game since it was read;
+        # otherwise read it again and re-apply this move on top
+        result = games_collection.update_one(
+            {'user_id': user_id, 'board_version': game.get('board_version', {'$exists': False})},
+            {'$set': {
+                'user_board': user_board,
+                'validation': state.to_dict(),
+                'board_version': ObjectId(),
+                'updated_at': datetime.utcnow()
+            }}
+        )
+        if result.matched_count:
+            return jsonify({
+                'success': True,
+                'conflicts': conflicts,
+                'complete': state.is_complete()
+            })
+    
+    return jsonify({'error': 'Game was changed by another request, please retry'}), 409
+
 @app.route('/api/submit-solution', methods=['POST'])
 def submit_solution():
     """
@@ -331,8 +590,20 @@ def submit_solution():
     if not session.get('user_id'):
         return jsonify({'error': 'Not authenticated'}), 401
     
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid request body'}), 400
     time_taken = data.get('time_taken')
+    if isinstance(time_taken, bool) or not isinstance(time_taken, (int, float)) \
+            or not math.isfinite(time_taken) or time_taken < 0:
+        return jsonify({'error': 'Invalid time_taken'}), 400
+    
+    # Only a board completed through the move endpoint counts as solved
+    user_id = ObjectId(session['user_id'])
+    game = games_collection.find_one({'user_id': user_id}, {'validation': 1})
+    if not game or not game.get('validation') \
+            or not ValidationState.from_dict(game['validation']).is_complete():
+        return jsonify({'error': 'Puzzle is not solved'}), 400
     
     target_time = session.get('target_time', 300)
     seconds_per_cell = session.get('seconds_per_cell', 15)
@@ -370,7 +641,6 @@ def submit_solution():
     session['puzzles_played'] = session.get('puzzles_played', 0) + 1
     
     # Update in database
-    user_id = ObjectId(session['user_id'])
     users_collection.update_one(
         {'_id': user_id},
         {
@@ -384,6 +654,9 @@ def submit_solution():
     # Clean up: Delete saved game since puzzle is completed
     games_collection.delete_one({'user_id': user_id})
 
+    # Get the next puzzle for the new skill band ready while the player celebrates
+    prefetch_next_puzzle(user_id, new_skill)
+
     # Get updated puzzles_played from database
     updated_user = users_collection.find_one({'_id': user_id})
     puzzles_played = updated_user.get('puzzles_played', 0) if updated_user else session['puzzles_played']
@@ -416,6 +689,11 @@ def debug_session():
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@app.route('/api/debug/cache', methods=['GET'])
+def debug_cache():
+    """Debug endpoint to check puzzle analysis/uniqueness cache hit rates"""
+    return jsonify(cache_stats())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
 
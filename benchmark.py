@@ -0,0 +1,75 @@
+"""
+Generator and solver benchmarks for every supported board size.
+
+    python benchmark.py                 # all sizes, 3 runs each
+    python benchmark.py --sizes 9 16 --runs 5
+"""
+import argparse
+import contextlib
+import copy
+import io
+import random
+import time
+
+from generator import BOX_SHAPES, SudokuGenerator, SudokuSolver
+
+
+DIFFICULTIES = ['easy', 'medium', 'hard', 'extreme']
+
+
+def time_call(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def benchmark_size(size, runs):
+    """Returns one row per difficulty: mean/max generation time, clues and solve time."""
+    rows = []
+    for difficulty in DIFFICULTIES:
+        generate_times, solve_times, clues = [], [], []
+        for _ in range(runs):
+            # Hard puzzles on small boards print a retry warning; keep output clean
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed, generator = time_call(lambda: SudokuGenerator(difficulty=difficulty, size=size))
+            generate_times.append(elapsed)
+            puzzle = generator.get_puzzle_and_analysis()['puzzle']
+            clues.append(sum(cell != 0 for row in puzzle for cell in row))
+            elapsed, solutions = time_call(lambda: SudokuSolver(copy.deepcopy(puzzle)).count_solutions())
+            # Guards the solver's pruning and node budget against regressions
+            assert solutions == 1, f"{size}x{size} {difficulty} puzzle has {solutions} solutions"
+            solve_times.append(elapsed)
+        rows.append({
+            'size': size,
+            'difficulty': difficulty,
+            'generate_mean': sum(generate_times) / runs,
+            'generate_max': max(generate_times),
+            'clues': sum(clues) / runs,
+            'solve_mean': sum(solve_times) / runs,
+        })
+    return rows
+
+
+def print_rows(rows):
+    print(f"{'size':>5} {'difficulty':<10}{'gen mean s':>12}{'gen max s':>11}"
+          f"{'clues':>8}{'unique-check ms':>17}")
+    for row in rows:
+        size = f"{row['size']}x{row['size']}"
+        print(f"{size:>5} {row['difficulty']:<10}{row['generate_mean']:>12.3f}"
+              f"{row['generate_max']:>11.3f}{row['clues']:>8.1f}"
+              f"{row['solve_mean'] * 1000:>17.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark puzzle generation per board size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=sorted(BOX_SHAPES),
+                        help="board sizes to benchmark")
+    parser.add_argument('--runs', type=int, default=3, help="puzzles generated per size and difficulty")
+    parser.add_argument('--seed', type=int, default=1234, help="random seed for repeatable runs")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rows = []
+    for size in args.sizes:
+        rows.extend(benchmark_size(size, args.runs))
+    print_rows(rows)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import SudokuBoard from './SudokuBoard';
 import NumberPad from './NumberPad';
 import Timer from './Timer';
@@ -25,6 +25,8 @@ function Game({ user, onLogout }) {
   });
   const [popup, setPopup] = useState({ show: false, message: '', type: 'info', showConfirm: false, action: null });
   const [showConfetti, setShowConfetti] = useState(false);
+  // Moves are sent to the server one after another; submit waits for them
+  const pendingMoves = useRef(Promise.resolve());
 
   // Function to refresh user stats from server
   const refreshUserStats = useCallback(async () => {
@@ -354,6 +356,42 @@ function Game({ user, onLogout }) {
       r.map((val, j) => (i === row && j === col ? num : val))
     );
     setUserBoard(updated);
+
+    // The server validates every move and only accepts boards completed this way
+    pendingMoves.current = pendingMoves.current.then(async () => {
+      const res = await fetch('http://localhost:5000/api/game/move', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        credentials: 'include',
+        body: JSON.stringify({ row, col, value: num }),
+      });
+      if (!res.ok) throw new Error(`Move rejected. Status: ${res.status}`);
+    }).catch(async (err) => {
+      console.error('Failed to send move:', err);
+      await resyncBoard();
+    });
+  };
+
+  // Puts the server's copy of the board back after a move failed to save
+  const resyncBoard = async () => {
+    try {
+      const response = await fetch('http://localhost:5000/api/game/load', {
+        credentials: 'include',
+      });
+      const data = await response.json();
+      if (data.has_saved_game && data.game && data.game.user_board) {
+        setUserBoard(data.game.user_board);
+      }
+    } catch (err) {
+      console.error('Failed to reload board:', err);
+    }
+    setPopup({
+      show: true,
+      message: 'Your last move could not be saved. The board has been restored from the server.',
+      type: 'error',
+      showConfirm: false,
+      action: null
+    });
   };
 
   const checkSolution = async () => {
@@ -362,6 +400,7 @@ function Game({ user, onLogout }) {
     const timeTaken = elapsedTime;
 
     if (isCorrect) {
+      await pendingMoves.current;
       const res = await fetch('http://localhost:5000/api/submit-solution', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
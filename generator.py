@@ -1,14 +1,69 @@
 import random
 import copy
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from itertools import combinations
 
 
+# Supported board sizes and their (rows, cols) box shape
+BOX_SHAPES = {4: (2, 2), 6: (2, 3), 9: (3, 3), 16: (4, 4)}
+
+
+def box_shape(size):
+    if size not in BOX_SHAPES:
+        raise ValueError(f"Unsupported board size {size}, expected one of {sorted(BOX_SHAPES)}")
+    return BOX_SHAPES[size]
+
+
+class LookupTables:
+    """
+    Precomputed geometry of one board shape: the cells of every row/col/box,
+    the box index of every cell and the peers of every cell.
+    """
+    def __init__(self, box_rows, box_cols):
+        size = box_rows * box_cols
+        self.size = size
+        self.box_rows = box_rows
+        self.box_cols = box_cols
+        self.all_digits_mask = (1 << size) - 1
+        # A band of box_rows rows holds box_rows boxes side by side
+        self.box_of = [[(r // box_rows) * box_rows + c // box_cols for c in range(size)]
+                       for r in range(size)]
+        self.units = {'row': [], 'col': [], 'box': [[] for _ in range(size)]}
+        for i in range(size):
+            self.units['row'].append([(i, c) for c in range(size)])
+            self.units['col'].append([(r, i) for r in range(size)])
+        for r in range(size):
+            for c in range(size):
+                self.units['box'][self.box_of[r][c]].append((r, c))
+        self.peers = {}
+        for r in range(size):
+            for c in range(size):
+                cell_peers = set(self.units['row'][r]) | set(self.units['col'][c])
+                cell_peers |= set(self.units['box'][self.box_of[r][c]])
+                cell_peers.discard((r, c))
+                self.peers[(r, c)] = frozenset(cell_peers)
+
+
+@lru_cache(maxsize=None)
+def lookup_tables(size):
+    return LookupTables(*box_shape(size))
+
+
+# Built once at import so a preforking server shares them across workers
+for _size in BOX_SHAPES:
+    lookup_tables(_size)
+
+
 class HumanSolver:
     """
     Analyzes a puzzle's difficulty based on the cognitive techniques
     required to solve it, mimicking a human's thought process.
     """
     def __init__(self, board):
+        self.size = len(board)
+        self.tables = lookup_tables(self.size)
         self.candidates = self._initialize_candidates(board)
         self.difficulty_score = 0
         self.hardest_technique = "None"
@@ -64,10 +119,10 @@ class HumanSolver:
 
     def _initialize_candidates(self, board):
         candidates = {}
-        for r in range(9):
-            for c in range(9):
+        for r in range(self.size):
+            for c in range(self.size):
                 if board[r][c] == 0:
-                    possible_nums = set(range(1, 10))
+                    possible_nums = set(range(1, self.size + 1))
                     for peer in self._get_peer_cells(r, c):
                         possible_nums.discard(board[peer[0]][peer[1]])
                     candidates[(r, c)] = possible_nums
@@ -83,8 +138,8 @@ class HumanSolver:
 
     def _find_hidden_singles(self):
         for unit_type in ['row', 'col', 'box']:
-            for i in range(9):
-                counts = {n: [] for n in range(1, 10)}
+            for i in range(self.size):
+                counts = {n: [] for n in range(1, self.size + 1)}
                 unit_cells = self._get_unit_cells(unit_type, i)
                 for cell in unit_cells:
                     if cell in self.candidates:
@@ -102,7 +157,7 @@ class HumanSolver:
         and eliminates those candidates from other cells in the unit.
         """
         for unit_type in ['row', 'col', 'box']:
-            for i in range(9):
+            for i in range(self.size):
                 unit_cells = self._get_unit_cells(unit_type, i)
                 # Find all cells with exactly two candidates
                 pairs = [cell for cell in unit_cells if cell in self.candidates and len(self.candidates[cell]) == 2]
@@ -127,12 +182,13 @@ class HumanSolver:
         Finds candidates in a box that are confined to a single row or column,
         allowing elimination of that candidate from the rest of the row/column.
         """
-        for box_idx in range(9):
+        max_line = max(self.tables.box_rows, self.tables.box_cols)
+        for box_idx in range(self.size):
             box_cells = self._get_unit_cells('box', box_idx)
-            for num in range(1, 10):
+            for num in range(1, self.size + 1):
                 num_placements = [cell for cell in box_cells if cell in self.candidates and num in self.candidates[cell]]
                 
-                if 2 <= len(num_placements) <= 3:
+                if 2 <= len(num_placements) <= max_line:
                     rows = {r for r, c in num_placements}
                     cols = {c for r, c in num_placements}
                     
@@ -140,7 +196,7 @@ class HumanSolver:
                     # Check if all are in the same row
                     if len(rows) == 1:
                         row = rows.pop()
-                        cells_to_clean = [(row, c) for c in range(9) if (row, c) not in box_cells]
+                        cells_to_clean = [(row, c) for c in range(self.size) if (row, c) not in box_cells]
                         for cell in cells_to_clean:
                             if cell in self.candidates and num in self.candidates[cell]:
                                 self.candidates[cell].discard(num)
@@ -149,7 +205,7 @@ class HumanSolver:
                     # Check if all are in the same column
                     if len(cols) == 1:
                         col = cols.pop()
-                        cells_to_clean = [(r, col) for r in range(9) if (r, col) not in box_cells]
+                        cells_to_clean = [(r, col) for r in range(self.size) if (r, col) not in box_cells]
                         for cell in cells_to_clean:
                             if cell in self.candidates and num in self.candidates[cell]:
                                 self.candidates[cell].discard(num)
@@ -174,43 +230,35 @@ class HumanSolver:
             self.hardest_technique = technique
 
     def _get_unit_cells(self, unit_type, index):
-        cells = []
-        if unit_type == 'row':
-            for c in range(9): cells.append((index, c))
-        elif unit_type == 'col':
-            for r in range(9): cells.append((r, index))
-        elif unit_type == 'box':
-            start_r, start_c = 3 * (index // 3), 3 * (index % 3)
-            for r in range(start_r, start_r + 3):
-                for c in range(start_c, start_c + 3):
-                    cells.append((r, c))
-        return cells
+        return self.tables.units[unit_type][index]
 
     def _get_peer_cells(self, r, c):
-        peers = set()
-        for i in range(9): peers.add((r, i)); peers.add((i, c))
-        box_r, box_c = 3 * (r // 3), 3 * (c // 3)
-        for i in range(box_r, box_r + 3):
-            for j in range(box_c, box_c + 3):
-                peers.add((i, j))
-        peers.discard((r, c))
-        return peers
+        return self.tables.peers[(r, c)]
 
     def _is_solved(self):
         return len(self.candidates) == 0
 
 
+MAX_CHECK_NODES = 100
+
+
 class SudokuGenerator:
-    def __init__(self, difficulty='medium'):
-        self.board = [[0 for _ in range(9)] for _ in range(9)]
+    def __init__(self, difficulty='medium', size=9):
+        self.size = size
+        self.board = [[0 for _ in range(size)] for _ in range(size)]
         self.brute_force_solver = SudokuSolver(self.board)
+        # Clue counts are tuned for 9x9 and scaled by area for other sizes
         difficulty_map = {'easy': 40, 'medium': 34, 'hard': 28, 'extreme': 22}
-        self.cells_to_fill = difficulty_map.get(difficulty, 34)
+        clues = difficulty_map.get(difficulty, 34)
+        self.cells_to_fill = clues if size == 9 else round(clues * size * size / 81)
         self.difficulty = difficulty
+        # Search budget per uniqueness check. Removals that cannot be proven
+        # safe within it are skipped, which bounds 16x16 generation time.
+        self.max_check_nodes = MAX_CHECK_NODES
 
         # Generate puzzle until we get the desired logical difficulty
         self._generate_valid_puzzle()
-        self._analyze_difficulty()
+        remember_puzzle(self.board, self.analysis)
 
     def _generate_valid_puzzle(self):
         """
@@ -229,25 +277,23 @@ class SudokuGenerator:
             self._poke_holes()
 
             # Step 3: Check logical difficulty
-            analysis = HumanSolver(self.board).analyze()
+            self.analysis = HumanSolver(self.board).analyze()
 
             if self.difficulty in ['hard', 'extreme']:
-                if analysis['hardest_technique'] in ['Naked Pair', 'Pointing Pair']:
+                if self.analysis['hardest_technique'] in ['Naked Pair', 'Pointing Pair']:
                     # ✅ Puzzle meets logical difficulty
-                    self.analysis = analysis
                     return
                 else:
                     # ❌ Puzzle too easy, retry
                     continue
             else:
                 # Easy/Medium → any unique puzzle is fine
-                self.analysis = analysis
                 return
 
         print("⚠ Warning: Max attempts reached, returning last puzzle (might be easier than desired).")
 
     def _generate_full_solution(self):
-        self.board = [[0 for _ in range(9)] for _ in range(9)]
+        self.board = [[0 for _ in range(self.size)] for _ in range(self.size)]
         self.brute_force_solver = SudokuSolver(self.board)
         self.brute_force_solver.solve()
         self.solution = copy.deepcopy(self.board)
@@ -258,9 +304,9 @@ class SudokuGenerator:
         Randomly removes cells until the target number of clues remain,
         ensuring the puzzle always has a unique solution.
         """
-        cells = [(r, c) for r in range(9) for c in range(9)]
+        cells = [(r, c) for r in range(self.size) for c in range(self.size)]
         random.shuffle(cells)
-        cells_to_remove = 81 - self.cells_to_fill
+        cells_to_remove = self.size * self.size - self.cells_to_fill
         removed_count = 0
 
         for row, col in cells:
@@ -270,74 +316,293 @@ class SudokuGenerator:
             temp = self.board[row][col]
             self.board[row][col] = 0
 
-            # Check uniqueness
-            board_copy = copy.deepcopy(self.board)
-            solver_for_check = SudokuSolver(board_copy)
-            if solver_for_check.count_solutions() != 1:
+            # The puzzle was unique before this removal, so it stays unique
+            # unless some solution puts a different digit in this cell
+            solver_for_check = SudokuSolver(self.board)
+            if solver_for_check.has_other_solution(row, col, temp, max_nodes=self.max_check_nodes):
                 # Restore if puzzle loses uniqueness
                 self.board[row][col] = temp
             else:
                 removed_count += 1
 
-    def _analyze_difficulty(self):
-        """
-        Final difficulty analysis using human techniques.
-        """
-        human_solver = HumanSolver(self.board)
-        full_analysis = human_solver.analyze()
-        self.analysis = {
-            "score": full_analysis["score"],
-            "hardest_technique": full_analysis["hardest_technique"]
-        }
-
     def get_puzzle_and_analysis(self):
         return {"puzzle": self.board, "solution": self.solution, "analysis": self.analysis}
 
+
+# Returned by SudokuSolver._find_hidden_single when the board cannot be completed
+DEAD_END = object()
+
+
 class SudokuSolver:
-    def __init__(self, board): self.board = board; self.solution_count = 0
+    """
+    Backtracking solver for any supported board size. Row, column and box
+    contents are kept as bitmasks (bit d-1 set when digit d is used), and the
+    search always branches on the empty cell with the fewest candidates.
+    The board is modified in place; only solve() leaves digits behind.
+    """
+    def __init__(self, board):
+        self.board = board
+        self.size = len(board)
+        self.tables = lookup_tables(self.size)
+        self.solution_count = 0
+        self.nodes_left = None
+
     def solve(self):
-        find = self._find_empty();
-        if not find: return True
-        else: row, col = find
-        nums = list(range(1, 10)); random.shuffle(nums)
-        for num in nums:
-            if self._is_valid(num, (row, col)):
-                self.board[row][col] = num
-                if self.solve(): return True
-                self.board[row][col] = 0
-        return False
+        """Fills the board with a random valid solution. Returns False if there is none."""
+        self.nodes_left = None
+        if not self._load_masks():
+            return False
+        return self._search(limit=1, randomize=True, keep_solution=True)
+
     def count_solutions(self, limit=2):
-        find = self._find_empty()
-        if not find: self.solution_count += 1; return
-        row, col = find
-        for num in range(1, 10):
-            if self._is_valid(num, (row, col)):
-                self.board[row][col] = num; self.count_solutions(limit)
-                if self.solution_count >= limit: return
-        self.board[row][col] = 0
+        """Counts solutions, stopping once `limit` are found. Leaves the board unchanged."""
+        self.solution_count = 0
+        self.nodes_left = None
+        if self._load_masks():
+            self._search(limit=limit, randomize=False, keep_solution=False)
         return self.solution_count
-    def _find_empty(self):
-        for i in range(9):
-            for j in range(9):
-                if self.board[i][j] == 0: return (i, j)
-        return None
-    def _is_valid(self, num, pos):
-        row, col = pos
-        if num in self.board[row]: return False
-        if num in [self.board[i][col] for i in range(9)]: return False
-        box_x, box_y = col // 3, row // 3
-        for i in range(box_y * 3, box_y * 3 + 3):
-            for j in range(box_x * 3, box_x * 3 + 3):
-                if self.board[i][j] == num: return False
+
+    def has_other_solution(self, row, col, digit, max_nodes=None):
+        """
+        True if the board can be solved with something other than `digit` at
+        (row, col). With `max_nodes`, gives up after that many search steps
+        and answers True, so callers relying on uniqueness stay safe.
+        """
+        if not self._load_masks():
+            return False
+        self.nodes_left = max_nodes
+        box = self.tables.box_of[row][col]
+        candidates = self._candidates(row, col, box) & ~(1 << (digit - 1))
+        self.empties.remove((row, col, box))
+        self.solution_count = 0
+        while candidates and not self.solution_count and self.nodes_left != 0:
+            bit = candidates & -candidates
+            candidates ^= bit
+            self._place(row, col, box, bit)
+            self._search(limit=1, randomize=False, keep_solution=False)
+            self._unplace(row, col, box, bit)
+        self.empties.append((row, col, box))
+        return self.solution_count > 0 or self.nodes_left == 0
+
+    def _load_masks(self):
+        """Builds the digit masks from the board. Returns False if the givens conflict."""
+        size = self.size
+        box_of = self.tables.box_of
+        self.rows = [0] * size
+        self.cols = [0] * size
+        self.boxes = [0] * size
+        self.empties = []
+        for r in range(size):
+            for c in range(size):
+                num = self.board[r][c]
+                box = box_of[r][c]
+                if num == 0:
+                    self.empties.append((r, c, box))
+                    continue
+                bit = 1 << (num - 1)
+                if (self.rows[r] | self.cols[c] | self.boxes[box]) & bit:
+                    return False
+                self.rows[r] |= bit
+                self.cols[c] |= bit
+                self.boxes[box] |= bit
         return True
 
+    def _candidates(self, row, col, box):
+        return self.tables.all_digits_mask & ~(self.rows[row] | self.cols[col] | self.boxes[box])
+
+    def _place(self, row, col, box, bit):
+        self.rows[row] |= bit
+        self.cols[col] |= bit
+        self.boxes[box] |= bit
+        self.board[row][col] = bit.bit_length()
+
+    def _unplace(self, row, col, box, bit):
+        self.rows[row] ^= bit
+        self.cols[col] ^= bit
+        self.boxes[box] ^= bit
+        self.board[row][col] = 0
+
+    def _find_hidden_single(self, masks):
+        """
+        Returns (empties index, digit bit) for a digit with a single possible
+        cell in some unit, DEAD_END if a digit has no cell left in a unit,
+        or None.
+        """
+        size = self.size
+        once = [0] * (3 * size)
+        twice = [0] * (3 * size)
+        for (r, c, box), mask in zip(self.empties, masks):
+            for unit in (r, size + c, 2 * size + box):
+                twice[unit] |= once[unit] & mask
+                once[unit] |= mask
+
+        placed = self.rows + self.cols + self.boxes
+        for unit in range(3 * size):
+            if (once[unit] | placed[unit]) != self.tables.all_digits_mask:
+                return DEAD_END
+            singles = once[unit] & ~twice[unit]
+            if singles:
+                bit = singles & -singles
+                kind, index = divmod(unit, size)
+                for i, cell in enumerate(self.empties):
+                    if cell[kind] == index and masks[i] & bit:
+                        return i, bit
+        return None
+
+    def _search(self, limit, randomize, keep_solution):
+        """Returns True once `limit` solutions have been found or the node budget runs out."""
+        if self.nodes_left is not None:
+            if self.nodes_left == 0:
+                return True
+            self.nodes_left -= 1
+        empties = self.empties
+        if not empties:
+            self.solution_count += 1
+            return self.solution_count >= limit
+
+        # Pick the most constrained empty cell
+        masks = [self._candidates(r, c, box) for r, c, box in empties]
+        best_index, best_mask, best_count = 0, 0, self.size + 1
+        for index, mask in enumerate(masks):
+            count = mask.bit_count()
+            if count < best_count:
+                best_index, best_mask, best_count = index, mask, count
+                if count <= 1:
+                    break
+        if best_count == 0:
+            return False
+
+        # No forced cell: look for a digit that fits only one cell of a unit
+        if best_count > 1:
+            hidden = self._find_hidden_single(masks)
+            if hidden is DEAD_END:
+                return False
+            if hidden is not None:
+                best_index, best_mask = hidden
+
+        # Swap-remove the chosen cell so it can be put back in O(1)
+        cell = empties[best_index]
+        empties[best_index] = empties[-1]
+        empties.pop()
+        row, col, box = cell
+
+        bits = []
+        while best_mask:
+            bit = best_mask & -best_mask
+            bits.append(bit)
+            best_mask ^= bit
+        if randomize:
+            random.shuffle(bits)
+
+        done = False
+        for bit in bits:
+            self._place(row, col, box, bit)
+            done = self._search(limit, randomize, keep_solution)
+            if done and keep_solution:
+                return True
+            self._unplace(row, col, box, bit)
+            if done:
+                break
+
+        empties.append(cell)
+        empties[best_index], empties[-1] = empties[-1], empties[best_index]
+        return done
+
+
+class LRUCache:
+    """A bounded, thread-safe least-recently-used cache with hit/miss counters."""
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Ratings and uniqueness verdicts for puzzles this process has served or
+# generated. Generation seeds them, so serving a pooled or prefetched puzzle
+# is a lookup rather than another analysis or solve.
+analysis_cache = LRUCache(maxsize=1024)
+uniqueness_cache = LRUCache(maxsize=1024)
+
+
+def board_key(board):
+    """
+    Canonical cache key for a board: its cells in row-major order as bytes.
+    Boards of different sizes never collide since the lengths differ.
+    """
+    return bytes(cell for row in board for cell in row)
+
+
+def analyze_puzzle(board):
+    """HumanSolver analysis of `board`, memoized by board contents."""
+    key = board_key(board)
+    analysis = analysis_cache.get(key)
+    if analysis is None:
+        analysis = HumanSolver(board).analyze()
+        analysis_cache.put(key, analysis)
+    return dict(analysis)
+
+
+def is_unique(board):
+    """True if `board` has exactly one solution, memoized by board contents."""
+    key = board_key(board)
+    unique = uniqueness_cache.get(key)
+    if unique is None:
+        unique = SudokuSolver(copy.deepcopy(board)).count_solutions() == 1
+        uniqueness_cache.put(key, unique)
+    return unique
+
+
+def remember_puzzle(board, analysis):
+    """Records a freshly generated (so unique) puzzle and its analysis."""
+    key = board_key(board)
+    analysis_cache.put(key, dict(analysis))
+    uniqueness_cache.put(key, True)
+
+
+def cache_stats():
+    return {"analysis": analysis_cache.stats(), "uniqueness": uniqueness_cache.stats()}
+
+
 def print_board(board, title="Sudoku Puzzle"):
+    box_rows, box_cols = box_shape(len(board))
+    width = len(str(len(board)))
     print(f"--- {title} ---")
+    line_length = 0
     for i, row in enumerate(board):
-        if i % 3 == 0 and i != 0: print("- - - - - - - - - - - -")
-        printable_row = [str(cell) if cell != 0 else '.' for cell in row]
-        print(f"{' '.join(printable_row[0:3])} | {' '.join(printable_row[3:6])} | {' '.join(printable_row[6:9])}")
-    print("-" * 23)
+        printable_row = [str(cell).rjust(width) if cell != 0 else '.'.rjust(width) for cell in row]
+        boxes = [' '.join(printable_row[j:j + box_cols]) for j in range(0, len(row), box_cols)]
+        line = ' | '.join(boxes)
+        line_length = len(line)
+        if i % box_rows == 0 and i != 0: print(' '.join('-' * ((line_length + 3) // 2)))
+        print(line)
+    print("-" * (line_length + 2))
 
 if __name__ == "__main__":
     # Test generator for different difficulties
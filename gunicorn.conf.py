@@ -0,0 +1,42 @@
+"""
+Gunicorn settings. Picked up automatically by `gunicorn app:app`.
+
+The app is imported once in the master and warmed up there, so every worker
+starts with the lookup tables and a stock of puzzles already in memory
+(shared copy-on-write). MongoDB clients are created per worker after fork.
+The worker count is left to gunicorn (-w, or WEB_CONCURRENCY, default 1).
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+preload_app = True
+
+# Puzzles kept per worker and difficulty. The pool is not refilled, so this
+# is how many new games per skill band each worker serves without generating.
+PUZZLES_PER_WORKER = int(os.getenv('PUZZLES_PER_WORKER', '4'))
+
+
+def on_starting(server):
+    import app
+    # server.cfg reflects -w/--workers as well as this file
+    pool_size = PUZZLES_PER_WORKER * server.cfg.workers
+    server.log.info("Warming up: generating %d puzzles per difficulty", pool_size)
+    app.warm_up(pool_size)
+    server.log.info("Puzzle pool ready: %s", app.puzzle_pool.size())
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in the workers do not write to (and so copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+    app.init_db()
+    # Worker ages count up from 1, so only the first batch of workers splits
+    # the master's stock. A worker forked later (after a crash, timeout or
+    # TTIN) starts with an empty pool: the master's copy still holds puzzles
+    # its predecessor may already have served.
+    if worker.age <= server.cfg.workers:
+        app.puzzle_pool.keep_share(worker.age - 1, server.cfg.workers)
+    else:
+        app.puzzle_pool.clear()
@@ -0,0 +1,171 @@
+"""
+Offline load test for the Flask API.
+
+Runs the app in-process against mongomock instead of a real MongoDB, and
+drives it with simulated players. Each player signs up, then plays a number
+of games: start a game, make moves with autosaves in between, check auth
+and submit.
+Reports throughput and p50/p95/p99 latency per endpoint.
+
+    pip install -r requirements.txt mongomock
+    python loadtest.py --users 20 --games 3 --saves 10
+"""
+import argparse
+import contextlib
+import io
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import mongomock
+except ImportError:
+    raise SystemExit("mongomock is required for the load test: pip install mongomock")
+
+import app as sudoku_app
+
+
+REPORTED_ENDPOINTS = [
+    '/api/new-game',
+    '/api/game/move',
+    '/api/game/save',
+    '/api/auth/check',
+    '/api/submit-solution',
+]
+
+
+class LatencyRecorder:
+    """Collects per-endpoint request latencies from many threads."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def use_fake_database():
+    """Point the app's collections at a fresh in-memory mongomock database."""
+    sudoku_app.init_db(mongomock.MongoClient())
+
+
+class SimulatedPlayer:
+    def __init__(self, index, recorder, games, saves, rng):
+        # HTTPS base URL so the Secure session cookie is sent back
+        self.client = sudoku_app.app.test_client()
+        self.base_url = 'https://localhost'
+        self.name = f"loadtest-player-{index}"
+        self.recorder = recorder
+        self.games = games
+        self.saves = saves
+        self.rng = rng
+
+    def _request(self, method, endpoint, json=None):
+        start = time.perf_counter()
+        response = self.client.open(endpoint, method=method, json=json, base_url=self.base_url)
+        elapsed = time.perf_counter() - start
+        self.recorder.record(endpoint, elapsed, response.status_code < 400)
+        return response
+
+    def run(self):
+        self._request('POST', '/api/auth/signup', {'name': self.name})
+        for _ in range(self.games):
+            self._play_one_game()
+
+    def _play_one_game(self):
+        game = self._request('POST', '/api/new-game').get_json()
+        puzzle, solution = game['puzzle'], game['solution']
+        user_board = [row[:] for row in puzzle]
+        empty_cells = [(r, c) for r in range(9) for c in range(9) if puzzle[r][c] == 0]
+        self.rng.shuffle(empty_cells)
+        start_time = int(time.time() * 1000)
+
+        # Fill the board in roughly even chunks between autosaves
+        per_save = max(1, len(empty_cells) // max(1, self.saves))
+        for i in range(self.saves):
+            chunk = empty_cells[i * per_save:(i + 1) * per_save]
+            if i == self.saves - 1:
+                chunk = empty_cells[i * per_save:]
+            for r, c in chunk:
+                user_board[r][c] = solution[r][c]
+                self._request('POST', '/api/game/move', {'row': r, 'col': c, 'value': solution[r][c]})
+            self._request('POST', '/api/game/save', {
+                'puzzle': puzzle,
+                'user_board': user_board,
+                'solution': solution,
+                'start_time': start_time,
+                'is_game_active': True,
+                'elapsed_time': i * 5,
+                'target_time': game['target_time'],
+            })
+            self._request('GET', '/api/auth/check')
+
+        time_taken = self.rng.randint(game['target_time'] // 2, game['target_time'] * 2)
+        self._request('POST', '/api/submit-solution', {'time_taken': time_taken})
+
+
+def run_load_test(users, games, saves, seed, pool_size=0):
+    use_fake_database()
+    sudoku_app.app.secret_key = sudoku_app.app.secret_key or 'loadtest-secret'
+    random.seed(seed)
+    recorder = LatencyRecorder()
+    players = [
+        SimulatedPlayer(i, recorder, games, saves, random.Random(seed + i))
+        for i in range(users)
+    ]
+
+    # new_game prints every puzzle; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Mirrors the gunicorn master's warm-up; not part of the timed run
+        sudoku_app.warm_up(pool_size)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            for future in [pool.submit(player.run) for player in players]:
+                future.result()
+        wall_time = time.perf_counter() - started
+
+    return recorder, wall_time
+
+
+def print_report(recorder, wall_time):
+    total_requests = sum(len(s) for s in recorder.samples.values())
+    print(f"Wall time: {wall_time:.2f}s, {total_requests} requests, "
+          f"{total_requests / wall_time:.1f} req/s overall")
+    print(f"{'endpoint':<24}{'count':>7}{'errors':>8}{'req/s':>9}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint in REPORTED_ENDPOINTS:
+        samples = sorted(recorder.samples.get(endpoint, []))
+        print(f"{endpoint:<24}{len(samples):>7}{recorder.errors.get(endpoint, 0):>8}"
+              f"{len(samples) / wall_time:>9.1f}"
+              f"{percentile(samples, 50) * 1000:>10.1f}"
+              f"{percentile(samples, 95) * 1000:>10.1f}"
+              f"{percentile(samples, 99) * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline load test for the SudokuSensei API")
+    parser.add_argument('--users', type=int, default=10, help="concurrent simulated players")
+    parser.add_argument('--games', type=int, default=2, help="games played by each player")
+    parser.add_argument('--saves', type=int, default=8, help="autosaves per game")
+    parser.add_argument('--pool', type=int, default=0,
+                        help="puzzles per difficulty to pre-generate, as the gunicorn warm-up does")
+    parser.add_argument('--seed', type=int, default=1234, help="random seed for repeatable runs")
+    args = parser.parse_args()
+
+    recorder, wall_time = run_load_test(args.users, args.games, args.saves, args.seed, args.pool)
+    print_report(recorder, wall_time)
@@ -0,0 +1,40 @@
+from collections import deque
+
+from generator import SudokuGenerator
+
+
+class PuzzlePool:
+    """
+    A stock of ready-made puzzles per difficulty, so /api/new-game can
+    answer without generating while the player waits.
+    """
+    def __init__(self, difficulties=('easy', 'medium', 'hard')):
+        self.stock = {difficulty: deque() for difficulty in difficulties}
+
+    def fill(self, per_difficulty):
+        """Generates puzzles until each difficulty holds `per_difficulty` of them."""
+        for difficulty, puzzles in self.stock.items():
+            while len(puzzles) < per_difficulty:
+                puzzles.append(SudokuGenerator(difficulty=difficulty).get_puzzle_and_analysis())
+
+    def take(self, difficulty):
+        """Returns a stocked puzzle for `difficulty`, or None if there is none left."""
+        puzzles = self.stock.get(difficulty)
+        if not puzzles:
+            return None
+        return puzzles.popleft()
+
+    def keep_share(self, index, count):
+        """
+        Keeps only every `count`-th puzzle starting at `index`. Each forked
+        worker calls this so workers never hand out the same puzzle.
+        """
+        for difficulty, puzzles in self.stock.items():
+            self.stock[difficulty] = deque(list(puzzles)[index::count])
+
+    def clear(self):
+        for puzzles in self.stock.values():
+            puzzles.clear()
+
+    def size(self):
+        return {difficulty: len(puzzles) for difficulty, puzzles in self.stock.items()}
@@ -0,0 +1,99 @@
+from generator import lookup_tables
+
+
+class ValidationState:
+    """
+    Server-side view of a game in progress. Row, column and box contents are
+    kept as bitmasks (bit d-1 set when digit d is on the board), so checking
+    a placement for conflicts is a few bit operations rather than a board
+    scan. `correct` counts cells that match the solution, which makes the
+    completion check a single comparison.
+    """
+    def __init__(self, size, rows, cols, boxes, correct):
+        self.size = size
+        self.tables = lookup_tables(size)
+        self.rows = rows
+        self.cols = cols
+        self.boxes = boxes
+        self.correct = correct
+
+    @classmethod
+    def build(cls, board, solution):
+        """Builds the state from scratch for `board` (givens plus player entries)."""
+        size = len(board)
+        state = cls(size, [0] * size, [0] * size, [0] * size, 0)
+        for r in range(size):
+            for c in range(size):
+                num = board[r][c]
+                if num:
+                    state._add(r, c, num)
+                    if num == solution[r][c]:
+                        state.correct += 1
+        return state
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['size'], data['rows'], data['cols'], data['boxes'], data['correct'])
+
+    def to_dict(self):
+        return {
+            'size': self.size,
+            'rows': self.rows,
+            'cols': self.cols,
+            'boxes': self.boxes,
+            'correct': self.correct,
+        }
+
+    def place(self, board, solution, row, col, num):
+        """
+        Puts `num` (0 clears the cell) at (row, col), updating `board` and the
+        masks. Returns the cells already holding `num` in the same row, column
+        or box; they are only looked up when the masks report a conflict.
+        """
+        old = board[row][col]
+        if old == num:
+            return self._find_conflicts(board, row, col, num) if num else []
+
+        if old:
+            board[row][col] = 0
+            self._remove(board, row, col, old)
+            if old == solution[row][col]:
+                self.correct -= 1
+
+        conflicts = []
+        if num:
+            box = self.tables.box_of[row][col]
+            if (self.rows[row] | self.cols[col] | self.boxes[box]) & (1 << (num - 1)):
+                conflicts = self._find_conflicts(board, row, col, num)
+            board[row][col] = num
+            self._add(row, col, num)
+            if num == solution[row][col]:
+                self.correct += 1
+        return conflicts
+
+    def is_complete(self):
+        return self.correct == self.size * self.size
+
+    def _add(self, row, col, num):
+        bit = 1 << (num - 1)
+        self.rows[row] |= bit
+        self.cols[col] |= bit
+        self.boxes[self.tables.box_of[row][col]] |= bit
+
+    def _remove(self, board, row, col, num):
+        # A digit can appear twice in a unit while the player has a conflict,
+        # so only clear its bit where no other copy is left
+        bit = 1 << (num - 1)
+        box = self.tables.box_of[row][col]
+        units = self.tables.units
+        if not any(board[r][c] == num for r, c in units['row'][row]):
+            self.rows[row] &= ~bit
+        if not any(board[r][c] == num for r, c in units['col'][col]):
+            self.cols[col] &= ~bit
+        if not any(board[r][c] == num for r, c in units['box'][box]):
+            self.boxes[box] &= ~bit
+
+    def _find_conflicts(self, board, row, col, num):
+        return sorted(
+            [r, c] for r, c in self.tables.peers[(row, col)] if board[r][c] == num
+        )